@@ -2,7 +2,6 @@ import typing
 
 import dash
 import logging
-import numpy as np
 import dash_daq as daq
 import plotly.io as pio
 import dash_bootstrap_components as dbc
@@ -11,7 +10,14 @@ from dash import html, dcc, ctx, ALL
 from dash.dash_table import DataTable
 from dash.dependencies import Input, Output, State
 from dataclasses import fields
-from utils import EndEffectorType, pin_mapping, EndEffectorPins
+from utils import (
+    EndEffectorType,
+    pin_mapping,
+    EndEffectorPins,
+    MemoryEntry,
+    MemoryType,
+    MotionType,
+)
 
 # Ensure dash is not spamming the console
 log = logging.getLogger("werkzeug")
@@ -27,8 +33,11 @@ class Dashboard:
     Attributes:
         get_pose (callable): Function to get the current pose of the robot.
         get_angles (callable): Function to get the current angles of the robot.
+        get_pose_generation (callable): Function to get the generation counter of the pose and angles.
         get_memory (callable): Function to get the current memory of the robot.
         get_feed (callable): Function to get the current feed of the robot.
+        get_memory_generation (callable): Function to get the generation counter of the memory.
+        get_feed_generation (callable): Function to get the generation counter of the feed.
         func_clear_error (callable): Function to clear the error of the robot.
         func_reconnect (callable): Function to reconnect the robot.
         func_save (callable): Function to save the memory of the robot.
@@ -46,6 +55,7 @@ class Dashboard:
         set_end_effector (callable): Function to set the end effector of the robot.
         set_end_effector_pins (callable): Function to set the end effector pins of the robot.
         set_end_effector_state (callable): Function to set the end effector state of the robot.
+        number_of_joints (int): The number of joints of the robot.
         app (dash.Dash): The dash app.
 
     Methods:
@@ -91,11 +101,12 @@ class Dashboard:
         end_effector_state: Returns the end effector state for the dashboard.
         end_effector_state_callback: Registers the end effector state callback.
         pose_display: Returns the pose display for the dashboard.
-        pose_display_callback: Registers the pose display callback.
+        pose_store_callback: Registers the pose store callback, which sends pose and angles as a single store update.
+        pose_display_callback: Registers the clientside callback spreading the pose store into the displays.
         angles_display: Returns the angles display for the dashboard.
-        angles_display_callback: Registers the angles display callback.
         memory_table: Returns the memory table for the dashboard.
         memory_table_callback: Registers the memory table callback.
+        memory_row: Returns the memory table row of a memory entry.
         feed_table: Returns the feed table for the dashboard.
         feed_table_callback: Registers the feed table callback.
         input_group: Returns an input group for the dashboard. (Used for pose and angles)
@@ -119,8 +130,11 @@ class Dashboard:
         self,
         get_pose,
         get_angles,
+        get_pose_generation,
         get_memory,
         get_feed,
+        get_memory_generation,
+        get_feed_generation,
         func_clear_error,
         func_reconnect,
         func_save,
@@ -138,6 +152,7 @@ class Dashboard:
         set_end_effector,
         set_end_effector_pins,
         set_end_effector_state,
+        number_of_joints: int = 4,
     ):
         """
         Initializes the Dashboard class.
@@ -145,8 +160,11 @@ class Dashboard:
         Args:
             get_pose (callable): Function to get the current pose of the robot.
             get_angles (callable): Function to get the current angles of the robot.
+            get_pose_generation (callable): Function to get the generation counter of the pose and angles.
             get_memory (callable): Function to get the current memory of the robot.
             get_feed (callable): Function to get the current feed of the robot.
+            get_memory_generation (callable): Function to get the generation counter of the memory.
+            get_feed_generation (callable): Function to get the generation counter of the feed.
             func_clear_error (callable): Function to clear the error of the robot.
             func_reconnect (callable): Function to reconnect the robot.
             func_save (callable): Function to save the memory of the robot.
@@ -164,11 +182,15 @@ class Dashboard:
             set_end_effector (callable): Function to set the end effector of the robot.
             set_end_effector_pins (callable): Function to set the end effector pins of the robot.
             set_end_effector_state (callable): Function to set the end effector state of the robot.
+            number_of_joints (int): The number of joints of the robot, one angles display per joint.
         """
         self.get_pose = get_pose
         self.get_angles = get_angles
+        self.get_pose_generation = get_pose_generation
         self.get_memory = get_memory
         self.get_feed = get_feed
+        self.get_memory_generation = get_memory_generation
+        self.get_feed_generation = get_feed_generation
         self.func_clear_error = func_clear_error
         self.func_reconnect = func_reconnect
         self.func_save = func_save
@@ -186,11 +208,17 @@ class Dashboard:
         self.set_end_effector = set_end_effector
         self.set_end_effector_pins = set_end_effector_pins
         self.set_end_effector_state = set_end_effector_state
+        self.number_of_joints = number_of_joints
+
+        # (generation, table data) of the last rendered memory and feed, shared by all clients
+        self._memory_cache = (None, ([], []))
+        self._feed_cache = (None, [])
 
         self.app = dash.Dash(
             __name__,
             external_stylesheets=[dbc.themes.BOOTSTRAP],
         )
+        self._keymap_url = self.app.get_asset_url("keymap.png")
 
         self.app.layout = dbc.Container(
             [
@@ -200,6 +228,14 @@ class Dashboard:
                     interval=200,
                     n_intervals=0,
                 ),
+                # Memory and feed tables are refreshed at a lower rate to keep the dash server thread idle
+                dcc.Interval(
+                    id="table-interval",
+                    interval=1000,
+                    n_intervals=0,
+                ),
+                # {"generation", "pose", "angles"} last sent to this client
+                dcc.Store(id="pose-store"),
                 *self.modals(),
                 self.title(),
                 dbc.Row(
@@ -295,7 +331,7 @@ class Dashboard:
                 State("save-modal", "is_open"),
                 State("save-modal-filename-input", "value"),
             ],
-            prevent_initial_callback=True,
+            prevent_initial_call=True,
         )
         def save_memory(n_save_outer, n_cancel, n_save_inner, is_open, filename):
             """
@@ -327,6 +363,7 @@ class Dashboard:
 
         @self.app.callback(
             Output("load-modal", "is_open"),
+            Output("load-modal-filename-alert", "is_open"),
             [
                 Input("load-memory-button", "n_clicks"),
                 Input("load-modal-cancel-button", "n_clicks"),
@@ -336,7 +373,7 @@ class Dashboard:
                 State("load-modal", "is_open"),
                 State("load-modal-filename-input", "value"),
             ],
-            prevent_initial_callback=True,
+            prevent_initial_call=True,
         )
         def load_memory(n_load_outer, n_cancel, n_load_inner, is_open, filename):
             """
@@ -441,16 +478,25 @@ class Dashboard:
 
         @self.app.callback(
             Output("keymap-modal", "is_open"),
+            Output("keymap-modal-body", "children"),
             [Input("keymap-button", "n_clicks")],
-            [State("keymap-modal", "is_open")],
-            prevent_initial_callback=True,
+            [
+                State("keymap-modal", "is_open"),
+                State("keymap-modal-body", "children"),
+            ],
+            prevent_initial_call=True,
         )
-        def keymap(n_clicks, is_open):
+        def keymap(n_clicks, is_open, body):
             """
-            Callback to open the keymap modal.
+            Callback to open the keymap modal. The keymap image is only mounted on first open.
             """
             if n_clicks:
-                return not is_open
+                if body:
+                    return not is_open, dash.no_update
+                return not is_open, html.Img(
+                    src=self._keymap_url,
+                    style={"height": "100%", "width": "100%"},
+                )
             return dash.no_update
 
     @staticmethod
@@ -803,26 +849,46 @@ class Dashboard:
             [f"pose-{i}-input" for i in ["x", "y", "z", "r"]],
         )
 
-    def pose_display_callback(self):
+    def pose_store_callback(self):
         """
-        Registers the pose display callback.
+        Registers the pose store callback, which sends pose and angles as a single store update.
         """
 
         @self.app.callback(
-            [
-                Output("pose-x-input", "value"),
-                Output("pose-y-input", "value"),
-                Output("pose-z-input", "value"),
-                Output("pose-r-input", "value"),
-            ],
+            Output("pose-store", "data"),
             [Input("interval", "n_intervals")],
+            [State("pose-store", "data")],
             prevent_initial_call=True,
         )
-        def update_pose(_):
+        def update_pose_store(_, data):
             """
-            Callback to update the pose display.
+            Callback to update the pose store. (Only sent when the pose or angles changed)
             """
-            return self.get_pose().tolist()
+            generation = self.get_pose_generation()
+            if data and data["generation"] == generation:
+                return dash.no_update
+            # Rounded on the server, the displays show two decimals and the payload stays short
+            return {
+                "generation": generation,
+                "pose": [round(value, 2) for value in self.get_pose().tolist()],
+                "angles": [round(value, 2) for value in self.get_angles().tolist()],
+            }
+
+    def pose_display_callback(self):
+        """
+        Registers the clientside callback spreading the pose store into the pose and angles displays.
+        """
+        self.app.clientside_callback(
+            # The pose display is always [x, y, z, r] (padded with empty fields), the angles display has one field per joint
+            "function(data) { return data.pose.concat([null, null, null, null]).slice(0, 4).concat(data.angles); }",
+            [Output(f"pose-{i}-input", "value") for i in ["x", "y", "z", "r"]]
+            + [
+                Output(f"angles-j{i}-input", "value")
+                for i in range(1, self.number_of_joints + 1)
+            ],
+            Input("pose-store", "data"),
+            prevent_initial_call=True,
+        )
 
     def angles_display(self) -> dbc.Container:
         """
@@ -830,27 +896,10 @@ class Dashboard:
         """
         return self.input_group(
             "Angles",
-            [f"J{i}" for i in range(1, 5)],
-            [f"angles-j{i}-input" for i in range(1, 5)],
+            [f"J{i}" for i in range(1, self.number_of_joints + 1)],
+            [f"angles-j{i}-input" for i in range(1, self.number_of_joints + 1)],
         )
 
-    def angles_display_callback(self):
-        @self.app.callback(
-            [
-                Output("angles-j1-input", "value"),
-                Output("angles-j2-input", "value"),
-                Output("angles-j3-input", "value"),
-                Output("angles-j4-input", "value"),
-            ],
-            [Input("interval", "n_intervals")],
-            prevent_initial_call=True,
-        )
-        def update_angles(_):
-            """
-            Callback to update the angles display.
-            """
-            return self.get_angles().tolist()
-
     def memory_table(self) -> dbc.Container:
         """
         Returns the memory table for the dashboard.
@@ -867,6 +916,7 @@ class Dashboard:
                 "R/J4",
                 "End Effector",
             ],
+            ["15%", "17%", "13%", "13%", "13%", "13%", "16%"],
         )
 
     def memory_table_callback(self):
@@ -875,36 +925,22 @@ class Dashboard:
                 Output("memory-table", "data"),
                 Output("memory-table", "style_data_conditional"),
             ],
-            [Input("interval", "n_intervals")],
+            [Input("table-interval", "n_intervals")],
             prevent_initial_call=True,
         )
         def update_memory(_):
             """
-            Callback to update the memory table.
+            Callback to update the memory table. (Only re-rendered when the memory generation changed)
             """
-            data = [el.serialize() for el in self.get_memory()]
+            generation = self.get_memory_generation()
+            if generation == self._memory_cache[0]:
+                return self._memory_cache[1]
+
+            memory = list(self.get_memory())
+            data = [self.memory_row(el) for el in memory]
             data_conditional = []
-            for i, el in enumerate(data):
-                if el["Type"] != "END_EFFECTOR":
-                    el["X/J1"] = np.round(el["Value"][0], 1)
-                    el["Y/J2"] = np.round(el["Value"][1], 1)
-                    el["Z/J3"] = np.round(el["Value"][2], 1)
-                    el["R/J4"] = np.round(el["Value"][3], 1)
-                    el["End Effector"] = ["-"]
-                elif el[("Motion Type")] == "GRIPPER":
-                    el["X/J1"] = ["-"]
-                    el["Y/J2"] = ["-"]
-                    el["Z/J3"] = ["-"]
-                    el["R/J4"] = ["-"]
-                    el["End Effector"] = "Open" if el["Value"][1][1] == 1 else "Close"
-                elif el[("Motion Type")] == "SUCTION_CUP":
-                    el["X/J1"] = ["-"]
-                    el["Y/J2"] = ["-"]
-                    el["Z/J3"] = ["-"]
-                    el["R/J4"] = ["-"]
-                    el["End Effector"] = "On" if el["Value"][1][1] == 0 else "Off"
-
-                if not el["Valid"]:
+            for i, el in enumerate(memory):
+                if not el.valid:
                     data_conditional.append(
                         {
                             "if": {"row_index": i},
@@ -912,8 +948,31 @@ class Dashboard:
                             "color": "white",
                         }
                     )
+            self._memory_cache = (generation, (data, data_conditional))
             return data, data_conditional
 
+    @staticmethod
+    def memory_row(entry: MemoryEntry) -> dict:
+        """
+        Returns the memory table row of a memory entry, holding only the displayed columns.
+        """
+        row = {"Type": entry.type.name, "Motion Type": entry.motion_type.name}
+        if entry.type != MemoryType.END_EFFECTOR:
+            for column, value in zip(
+                ["X/J1", "Y/J2", "Z/J3", "R/J4"], entry.value.tolist()
+            ):
+                row[column] = round(value, 1)
+            row["End Effector"] = "-"
+            return row
+
+        for column in ["X/J1", "Y/J2", "Z/J3", "R/J4"]:
+            row[column] = "-"
+        if entry.motion_type == MotionType.GRIPPER:
+            row["End Effector"] = "Open" if entry.value[1][1] == 1 else "Close"
+        elif entry.motion_type == MotionType.SUCTION_CUP:
+            row["End Effector"] = "On" if entry.value[1][1] == 0 else "Off"
+        return row
+
     def feed_table(self) -> dbc.Container:
         """
         Returns the feed table for the dashboard.
@@ -922,6 +981,7 @@ class Dashboard:
             "Feed Log",
             "feed-table",
             ["Timestamp", "Message", "Source"],
+            ["20%", "60%", "20%"],
         )
 
     def feed_table_callback(self):
@@ -931,15 +991,19 @@ class Dashboard:
 
         @self.app.callback(
             Output("feed-table", "data"),
-            [Input("interval", "n_intervals")],
+            [Input("table-interval", "n_intervals")],
             prevent_initial_call=True,
         )
         def update_feed(_):
             """
-            Callback to update the feed table.
+            Callback to update the feed table. (Only re-rendered when the feed generation changed)
             """
-            data = [el.serialize() for el in reversed(self.get_feed())]
-            return data
+            generation = self.get_feed_generation()
+            if generation != self._feed_cache[0]:
+                # Snapshot first, the recorder threads keep appending to the feed
+                data = [el.serialize() for el in reversed(list(self.get_feed()))]
+                self._feed_cache = (generation, data)
+            return self._feed_cache[1]
 
     @staticmethod
     def input_group(title, labels, ids):
@@ -972,9 +1036,11 @@ class Dashboard:
         )
 
     @staticmethod
-    def table(label, idx, columns, data_conditional=None, hidden_columns=None):
+    def table(label, idx, columns, widths, data_conditional=None, hidden_columns=None):
         """
         Returns a table for the dashboard. (Used for memory and feed)
+
+        The column widths are fixed, so the table skips its auto-sizing pass on every data update.
         """
         return dbc.Container(
             [
@@ -983,17 +1049,29 @@ class Dashboard:
                     id=idx,
                     columns=[{"name": i, "id": i} for i in columns],
                     data=[],
+                    # Only render the visible rows, the tables can grow to thousands of rows
+                    virtualization=True,
+                    fixed_rows={"headers": True},
+                    page_action="none",
                     style_table={
                         "maxHeight": "55vh",
                         "overflowY": "scroll",
                     },
                     style_cell={
                         "textAlign": "left",
-                        "whiteSpace": "pre-line",
+                        "whiteSpace": "nowrap",
+                        "overflow": "hidden",
+                        "textOverflow": "ellipsis",
                         "font-family": "sans-serif",
                     },
                     style_cell_conditional=[
-                        {"if": {"column_id": ""}, "textAlign": "left"}
+                        {
+                            "if": {"column_id": column},
+                            "width": width,
+                            "minWidth": width,
+                            "maxWidth": width,
+                        }
+                        for column, width in zip(columns, widths)
                     ],
                     style_as_list_view=True,
                     style_header={
@@ -1046,7 +1124,7 @@ class Dashboard:
             Output(idx, "value"),
             Output(idx, "color"),
             Input("interval", "n_intervals"),
-            prevent_initial_callback=True,
+            prevent_initial_call=True,
         )
         def indicator_callback(n_intervals):
             """
@@ -1087,7 +1165,7 @@ class Dashboard:
         @self.app.callback(
             Output(idx, "value"),
             Input(idx, "value"),
-            prevent_initial_callback=True,
+            prevent_initial_call=True,
         )
         def slider_callback(value):
             """
@@ -1140,17 +1218,13 @@ class Dashboard:
             is_open=False,
         )
 
-    def keymap_modal(self):
+    @staticmethod
+    def keymap_modal() -> dbc.Modal:
         """
-        Returns a keymap modal for the dashboard.
+        Returns a keymap modal for the dashboard. (The image is mounted lazily by the keymap button callback)
         """
         return dbc.Modal(
-            dbc.ModalBody(
-                html.Img(
-                    src=self.app.get_asset_url("keymap.png"),
-                    style={"height": "100%", "width": "100%"},
-                )
-            ),
+            dbc.ModalBody(id="keymap-modal-body"),
             id="keymap-modal",
             is_open=False,
             size="xl",
@@ -1207,8 +1281,8 @@ class Dashboard:
 
         self.end_effector_callbacks()
 
+        self.pose_store_callback()
         self.pose_display_callback()
-        self.angles_display_callback()
 
         self.memory_table_callback()
         self.feed_table_callback()
@@ -9,6 +9,7 @@ if __name__ == "__main__":
         end_effector=EndEffectorType.SUCTION_CUP,
         end_effector_pins=AirPumpPins(13, 12),
         end_effector_state=0,
+        feedback_port=30004,
     )
     time.sleep(1)
     recorder.start()
@@ -16,8 +17,11 @@ if __name__ == "__main__":
     dashboard = Dashboard(
         lambda: recorder.displayed_pose,  # lambda is necessary to update address of variable
         lambda: recorder.displayed_angles,
+        lambda: recorder.pose_generation,
         lambda: recorder.memory,
         lambda: recorder.feed,
+        lambda: recorder.memory_generation,
+        lambda: recorder.feed_generation,
         recorder.clear_error,
         recorder.reconnect,
         recorder.dump_memory,
@@ -35,5 +39,6 @@ if __name__ == "__main__":
         recorder.set_end_effector,
         recorder.set_end_effector_pins,
         recorder.set_end_effector_state,
+        recorder.number_of_joints,
     )
     dashboard.run()
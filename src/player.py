@@ -1,5 +1,5 @@
-import json
-from utils import *
+import orjson
+from utils import MemoryEntry
 from robot_interface import RobotInterface
 
 
@@ -16,12 +16,17 @@ class RobotPlayer(RobotInterface):
         self.memory = None
 
     def read_memory(self, memory_path: str):
-        with open(memory_path, "r") as f:
-            self.memory = json.load(f)
-            self.memory = [MemoryEntry.from_dict(entry) for entry in self.memory]
+        with open(memory_path, "rb") as f:
+            self.memory = [MemoryEntry.from_dict(entry) for entry in orjson.loads(f.read())]
 
     def replay(self, indices: slice = slice(None)):
-        super().replay(self.memory[indices])
+        if indices == slice(None):
+            super().replay(self.memory)
+        else:
+            # Iterate the selected entries in place instead of copying a slice of the memory
+            super().replay(
+                self.memory[i] for i in range(*indices.indices(len(self.memory)))
+            )
 
     def print_memory(self):
         print(
@@ -35,6 +40,7 @@ class RobotPlayer(RobotInterface):
 
 if __name__ == "__main__":
     import keyboard
+    import threading
 
     player = RobotPlayer()
     player.read_memory("./recordings/memory.json")
@@ -42,6 +48,10 @@ if __name__ == "__main__":
     player.print_memory()
 
     print("Press the spacebar to replay...")
-    keyboard.wait("space")
+    # Park the main thread on an event instead of keyboard.wait's polling loop
+    space_pressed = threading.Event()
+    hook = keyboard.on_press_key("space", lambda _: space_pressed.set())
+    space_pressed.wait()
+    keyboard.unhook(hook)
 
     player.replay()
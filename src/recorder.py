@@ -1,26 +1,167 @@
+import os
 import time
-import json
+import orjson
 import colorsys
 import operator
+import functools
+import collections
 import threading
+import concurrent.futures
+import numpy as np
 
 from typing import override
+from datetime import datetime
 from controller_interface import ControllerInterface
 from robot_interface import RobotInterface
-from utils import *
+from utils import (
+    Keymap,
+    FeedEntry,
+    MemoryEntry,
+    MemoryType,
+    MotionType,
+    EndEffectorPins,
+    EndEffectorType,
+)
 
+# Indices of the controller inputs in RobotRecorder.controller_buffer
+JOINT_POS, JOINT_NEG, LEFT_JOYSTICK, RIGHT_JOYSTICK = range(4)
 
-class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
+
+def signal_input(controller_buffer: np.ndarray, input_active: threading.Event):
+    """
+    Set input_active while any lane of the controller buffer is non-zero, clear it otherwise.
+
+    Args:
+        controller_buffer (np.ndarray): The controller buffer.
+        input_active (threading.Event): The event the control loop waits on.
+    """
+    active = any(controller_buffer.tolist())
+    if active != input_active.is_set():
+        if active:
+            input_active.set()
+        else:
+            input_active.clear()
+
+
+def write_trigger(
+    controller_buffer: np.ndarray, input_active: threading.Event, index: int, state: int
+):
+    """
+    Write a trigger (R2/L2) state into the controller buffer, ignoring values below the deadzone.
+
+    Args:
+        controller_buffer (np.ndarray): The controller buffer to write to.
+        input_active (threading.Event): The event signalling non-zero controller input.
+        index (int): The lane of the controller buffer.
+        state (int): The trigger state in [0, 255].
+    """
+    controller_buffer[index] = state / 255 if state > 5 else 0
+    signal_input(controller_buffer, input_active)
+
+
+def write_joystick(
+    controller_buffer: np.ndarray,
+    input_active: threading.Event,
+    index: int,
+    stateX: int,
+    stateY: int,
+):
+    """
+    Write the x axis of a joystick into the controller buffer, ignoring values below the deadzone.
+
+    Args:
+        controller_buffer (np.ndarray): The controller buffer to write to.
+        input_active (threading.Event): The event signalling non-zero controller input.
+        index (int): The lane of the controller buffer.
+        stateX (int): The x axis state in [-128, 127].
+        stateY (int): The y axis state in [-128, 127]. (Unused)
+    """
+    controller_buffer[index] = stateX / 128 if abs(stateX) > 5 else 0
+    signal_input(controller_buffer, input_active)
+
+
+def mix_movement(
+    joint_mix: np.ndarray,
+    controller_buffer: np.ndarray,
+    max_speed: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    Compute the joint movement from the controller input without allocating.
+
+    Args:
+        joint_mix (np.ndarray): The (number_of_joints, 4) matrix mapping controller inputs to joints.
+        controller_buffer (np.ndarray): The controller input values.
+        max_speed (np.ndarray): The maximum speed for each joint.
+        out (np.ndarray): The array the movement is written to.
+
+    Returns:
+        np.ndarray: out
+    """
+    np.dot(joint_mix, controller_buffer, out=out)
+    np.multiply(out, max_speed, out=out)
+    return out
+
+
+def bound(
+    current: np.ndarray, movement: np.ndarray, lo: np.ndarray, hi: np.ndarray, out: np.ndarray
+) -> np.ndarray:
+    """
+    Clip current + movement to [lo, hi] and return the resulting movement without allocating.
+
+    Args:
+        current (np.ndarray): The current joint angles.
+        movement (np.ndarray): The attempted movement.
+        lo (np.ndarray): The lower joint bounds.
+        hi (np.ndarray): The upper joint bounds.
+        out (np.ndarray): The array the bounded movement is written to, may be movement itself.
+
+    Returns:
+        np.ndarray: out
+    """
+    np.add(current, movement, out=out)
+    np.clip(out, lo, hi, out=out)
+    np.subtract(out, current, out=out)
+    return out
+
+
+def apply_deadzone(
+    movement: np.ndarray, threshold: float, magnitude: np.ndarray, mask: np.ndarray
+) -> bool:
+    """
+    Zero the components of the movement below the threshold in place, without allocating arrays.
+
+    Args:
+        movement (np.ndarray): The movement, modified in place.
+        threshold (float): The smallest absolute movement that is kept.
+        magnitude (np.ndarray): Scratch array for the absolute movement.
+        mask (np.ndarray): Scratch boolean array for the deadzone mask.
+
+    Returns:
+        bool: True if any component is left, False otherwise.
+    """
+    np.abs(movement, out=magnitude)
+    np.less(magnitude, threshold, out=mask)
+    np.copyto(movement, 0, where=mask)
+    # For a handful of joints the membership test on a list is faster than np.all
+    return False in mask.tolist()
+
+
+class RobotRecorder(RobotInterface, ControllerInterface):
     """
     RobotRecorder class to program a dobot m4 pro robot with a playstation controller.
 
     Attributes:
         number_of_joints (int): The number of joints of the robot.
-        feed (list): A list of feed entries.
+        feed (collections.deque): The latest feed entries, older entries are dropped once feed_size is reached.
+        feed_generation (int): Counter incremented on every change of the feed.
         memory (list): A list of memory entries.
-        displayed_pose (np.ndarray): The displayed pose of the robot.
-        displayed_angles (np.ndarray): The displayed angles of the robot.
-        controller_buffer (dict): A dictionary containing the controller buffer values.
+        memory_generation (int): Counter incremented on every change of the memory.
+        displayed_state (np.ndarray): The displayed pose and angles of the robot as a (2, number_of_joints) array.
+        displayed_pose (np.ndarray): The displayed pose of the robot. (View of displayed_state)
+        displayed_angles (np.ndarray): The displayed angles of the robot. (View of displayed_state)
+        pose_generation (int): Counter incremented whenever the displayed pose or angles change.
+        controller_buffer (np.ndarray): The controller input values, indexed by JOINT_POS, JOINT_NEG, LEFT_JOYSTICK and RIGHT_JOYSTICK.
         max_speed (np.ndarray): The maximum speed for each joint of the robot.
         linear_speed (float): The linear speed for the robot.
         joystick_mapping (dict): A dictionary mapping joystick names to joint indices.
@@ -30,6 +171,11 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         end_effector_state (int): The state of the end effector.
         mode (MemoryType): The memory mode of the robot.
         running (bool): A flag indicating if the robot is running.
+        autosave_interval (float): The interval in seconds in which changed memory is written to ./recordings/memory.json.
+        control_period (float): The time in seconds between two move_robot calls.
+        control_cpu (int): The CPU the control loop is pinned to, None to not pin it.
+        control_priority (int): The SCHED_FIFO priority of the control loop, None to keep the default scheduling.
+        display_interval (float): The interval in seconds in which the displayed pose and angles are refreshed.
 
     Methods:
         reconnect(): Reconnects the robot.
@@ -41,9 +187,17 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         default_keymap(): Sets the default keymap.
         load_memory(filename="memory.json"): Loads the memory from a file.
         dump_memory(filename="memory.json"): Dumps the memory to a file.
+        write_memory(filename="memory.json"): Writes a snapshot of the memory to a file.
+        autosave_memory(stopped: threading.Event): Background loop writing changed memory to a file.
         start(): Starts the robot recording.
         stop(): Stops the robot recording.
-        bound_movement(movement: list): Bounds the movement of the robot.
+        join(timeout=None): Waits for the control and display loops to finish.
+        is_alive(): Checks if the control loop is running.
+        set_control_scheduling(): Pins the control loop to a CPU and raises its priority.
+        restore_scheduling(previous: tuple): Restores the scheduling saved by set_control_scheduling.
+        refresh_display(): Background loop updating the displayed pose and angles.
+        wait_for_tick(deadline: float): Waits for the deadline of the next control tick.
+        bound_movement(movement: np.ndarray, out: np.ndarray = None): Bounds the movement of the robot.
         move_robot(): Moves the robot.
     """
 
@@ -64,6 +218,13 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         end_effector: EndEffectorType = EndEffectorType.NO_END_EFFECTOR,
         end_effector_pins: EndEffectorPins = None,
         end_effector_state: int = 0,
+        autosave_interval: float = 5.0,
+        control_rate: float = 100.0,
+        feed_size: int = 10_000,
+        control_cpu: int = None,
+        control_priority: int = None,
+        display_interval: float = 0.1,
+        feedback_port: int = None,
     ):
         """
         Initialize the Recorder object.
@@ -82,22 +243,35 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
             end_effector (EndEffectorType, optional): The end effector of the robot. Defaults to EndEffectorType.NO_END_EFFECTOR.
             end_effector_pins (EndEffectorPins, optional): The pins for the end effector. Defaults to None.
             end_effector_state (int, optional): The initial state of the end effector. Defaults to 0.
+            autosave_interval (float, optional): The interval in seconds in which changed memory is written to ./recordings/memory.json. Defaults to 5.0.
+            control_rate (float, optional): The number of move_robot calls per second. Defaults to 100.0.
+            feed_size (int, optional): The maximum number of feed entries kept. Defaults to 10_000.
+            control_cpu (int, optional): The CPU to pin the control loop to. (Linux only) Defaults to None.
+            control_priority (int, optional): The SCHED_FIFO priority of the control loop. (Linux only, requires CAP_SYS_NICE) Defaults to None.
+            display_interval (float, optional): The interval in seconds in which the displayed pose and angles are refreshed. Defaults to 0.1.
+            feedback_port (int, optional): The port number of the robot's real-time feedback server (30004). Defaults to None (not used).
         """
 
         self.number_of_joints = number_of_joints
 
-        self.feed = []
+        self.feed = collections.deque(maxlen=feed_size)
+        self.feed_generation = 0
         self.memory = []
-
-        self.displayed_pose = np.array([0, 0, 0, 0])
-        self.displayed_angles = np.array([0, 0, 0, 0])
-
-        self.controller_buffer = {
-            "joint_pos": 0,
-            "joint_neg": 0,
-            "left_joystick": 0,
-            "right_joystick": 0,
-        }
+        self.memory_generation = 0
+
+        # Pose and angles live in one contiguous buffer, the displayed arrays are row views of it
+        self.displayed_state = np.zeros((2, number_of_joints))
+        self.displayed_pose = self.displayed_state[0]
+        self.displayed_angles = self.displayed_state[1]
+        # The views handed to the dashboard are read-only, only run() writes through displayed_state
+        self.displayed_pose.flags.writeable = False
+        self.displayed_angles.flags.writeable = False
+        self._state_buffer = np.zeros((2, number_of_joints))
+        self.pose_generation = 0
+
+        self.controller_buffer = np.zeros(4)
+        # Set by the trigger and joystick handlers while the controller buffer is non-zero
+        self._input_active = threading.Event()
 
         self.max_speed = max_speed
         self.linear_speed = linear_speed
@@ -105,13 +279,45 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
             "left": left_joystick_joint,
             "right": right_joystick_joint,
         }
-        self.joint_bounds = joint_bounds
+        self.joint_bounds = np.array(joint_bounds)
+        # Contiguous copies of the bound columns for bound_movement, kept in sync by set_end_effector
+        self._lower_bounds = np.ascontiguousarray(self.joint_bounds[:, 0], dtype=float)
+        self._upper_bounds = np.ascontiguousarray(self.joint_bounds[:, 1], dtype=float)
 
         self.active_joint = number_of_joints // 2
+        self._joint_mix = np.zeros((number_of_joints, 4))
+        # LED color per joint, evenly spaced hues
+        self._joint_colors = [
+            tuple(int(c * 255) for c in colorsys.hsv_to_rgb(i / number_of_joints, 1, 1))
+            for i in range(number_of_joints)
+        ]
+        # Scratch buffers reused by move_robot on every tick
+        self._movement_buffer = np.zeros(number_of_joints)
+        self._magnitude_buffer = np.zeros(number_of_joints)
+        self._deadzone_mask = np.zeros(number_of_joints, dtype=bool)
+        self._angles_buffer = np.zeros(number_of_joints)
 
         self.mode = MemoryType.ABSOLUTE
         self.running = False
 
+        # Created by start, one worker for the control loop and one for the display loop
+        self._executor = None
+        self._control_loop = None
+        self._display_loop = None
+        self.display_interval = display_interval
+        self.control_period = 1.0 / control_rate
+        self.control_cpu = control_cpu
+        self.control_priority = control_priority
+
+        self.autosave_interval = autosave_interval
+        # An untouched memory counts as saved, so neither autosave nor stop overwrites the last recording with []
+        self._autosaved_generation = self.memory_generation
+        # Serializes write_memory, the autosave thread and the dashboard write to the same temporary file
+        self._write_lock = threading.Lock()
+        # Created by start, a finished thread can not be restarted
+        self._autosave_stopped = None
+        self._autosave_thread = None
+
         RobotInterface.__init__(
             self,
             robot_ip,
@@ -122,44 +328,40 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
             end_effector,
             end_effector_pins,
             end_effector_state,
+            feedback_port,
         )
         ControllerInterface.__init__(self, keymap, self.add_feed)
         if self.keymap is None:
             self.default_keymap()
 
         self.set_controls()
+        self.update_joint_mix()
         self.indicate_active_joint()
 
-        threading.Thread.__init__(self)
-
     def reconnect(self):
         """
         Reconnects the robot interface and controller.
 
         This method is responsible for reconnecting the robot interface and controller after a disconnection.
         It performs the following steps:
-        1. Sets the 'running' flag to False, which leads to the thread dying.
-        2. Sleeps for 0.5 seconds to allow time for the thread to terminate.
+        1. Sets the 'running' flag to False, which leads to the control loop finishing.
+        2. Waits up to 1 second for the control and display loops to finish.
         3. Calls the 'default_keymap' method to reinitialize the keymap, as 'self.dashboard' and other attributes may have changed.
         4. Closes the controller if it is still alive.
         5. Calls the 'reconnect' method of the 'RobotInterface' class to reconnect the robot interface.
         6. Calls the 'connect_controller' method to reconnect the controller.
         7. Calls the 'set_controls' method to set the controls.
-        8. Sets the 'running' flag to True.
-        9. Re-initializes the thread.
-        10. Starts the thread.
+        8. Calls the 'start' method to submit a new control loop.
 
         """
         self.running = False
-        time.sleep(0.5)
+        self.join(timeout=1.0)
         self.default_keymap()
         if self.controller_is_alive():
             self.controller.close()
         RobotInterface.reconnect(self)
         self.connect_controller()
         self.set_controls()
-        self.running = True
-        threading.Thread.__init__(self)
         self.start()
 
     def add_feed(self, msg: str, source: str):
@@ -174,6 +376,7 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
             This is the main print method of the application.
         """
         self.feed.append(FeedEntry(datetime.now(), msg, source))
+        self.feed_generation += 1
 
     @override
     def set_end_effector(self, end_effector: EndEffectorType):
@@ -190,6 +393,7 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
             self.joint_bounds[2][0] = 85
         elif end_effector == EndEffectorType.SUCTION_CUP:
             self.joint_bounds[2][0] = 45
+        self._lower_bounds[2] = self.joint_bounds[2][0]
         self.default_keymap()
         self.set_controls()
 
@@ -204,19 +408,25 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         """
         entry = MemoryEntry(memory_type, motion_type, value)
         self.memory.append(entry)
+        self.memory_generation += 1
 
     def indicate_active_joint(self):
         """
         Indicate the active joint with the controller LEDs.
         """
-        color = (
-            np.array(
-                colorsys.hsv_to_rgb(self.active_joint / self.number_of_joints, 1, 1)
-            )
-            * 255
-        )
-        color = [int(c) for c in color]
-        self.controller.light.setColorI(*color)
+        self.controller.light.setColorI(*self._joint_colors[self.active_joint])
+
+    def update_joint_mix(self):
+        """
+        Update the matrix mapping the controller buffer to the joints.
+
+        Needs to be called whenever the active joint changes.
+        """
+        self._joint_mix.fill(0)
+        self._joint_mix[self.active_joint, JOINT_POS] = 1
+        self._joint_mix[self.active_joint, JOINT_NEG] = -1
+        self._joint_mix[self.joystick_mapping["left"], LEFT_JOYSTICK] = 1
+        self._joint_mix[self.joystick_mapping["right"], RIGHT_JOYSTICK] = 1
 
     def indicate_mode(self):
         """
@@ -265,6 +475,7 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         def delete_func(state):
             if state and self.memory:
                 del self.memory[-1]
+                self.memory_generation += 1
 
         def replay_func(state):
             if state:
@@ -346,28 +557,11 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
             def cycle_joint_func(state):
                 if state:
                     self.active_joint = op(self.active_joint, 1) % self.number_of_joints
+                    self.update_joint_mix()
                     self.indicate_active_joint()
 
             return cycle_joint_func
 
-        def generate_button2_recording_func(key):
-            def button2_recording_func(state):
-                if state > 5:
-                    self.controller_buffer[key] = state / 255
-                else:
-                    self.controller_buffer[key] = 0
-
-            return button2_recording_func
-
-        def generate_joystick_recording_func(key):
-            def joystick_recording_func(stateX, stateY):
-                if np.abs(stateX) > 5:
-                    self.controller_buffer[key] = stateX / 128
-                else:
-                    self.controller_buffer[key] = 0
-
-            return joystick_recording_func
-
         def generate_linear_move_func(movement):
             def linear_move_func(state):
                 if state:
@@ -390,17 +584,17 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
             circle_pressed=end_effector_func[self.end_effector],
             r1_changed=generate_cycle_joint_func(operator.add),
             l1_changed=generate_cycle_joint_func(operator.sub),
-            r2_changed=generate_button2_recording_func(
-                list(self.controller_buffer.keys())[0]
+            r2_changed=functools.partial(
+                write_trigger, self.controller_buffer, self._input_active, JOINT_POS
             ),
-            l2_changed=generate_button2_recording_func(
-                list(self.controller_buffer.keys())[1]
+            l2_changed=functools.partial(
+                write_trigger, self.controller_buffer, self._input_active, JOINT_NEG
             ),
-            left_joystick_changed=generate_joystick_recording_func(
-                list(self.controller_buffer.keys())[2]
+            left_joystick_changed=functools.partial(
+                write_joystick, self.controller_buffer, self._input_active, LEFT_JOYSTICK
             ),
-            right_joystick_changed=generate_joystick_recording_func(
-                list(self.controller_buffer.keys())[3]
+            right_joystick_changed=functools.partial(
+                write_joystick, self.controller_buffer, self._input_active, RIGHT_JOYSTICK
             ),
             dpad_up=generate_linear_move_func([-self.linear_speed, 0, 0, 0]),
             dpad_down=generate_linear_move_func([self.linear_speed, 0, 0, 0]),
@@ -421,8 +615,11 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         if not filename.endswith(".json"):
             filename += ".json"
         try:
-            with open("./recordings/" + filename, "r") as f:
-                self.memory = [MemoryEntry.from_dict(entry) for entry in json.load(f)]
+            with open("./recordings/" + filename, "rb") as f:
+                self.memory = [
+                    MemoryEntry.from_dict(entry) for entry in orjson.loads(f.read())
+                ]
+                self.memory_generation += 1
                 self.add_feed(f"Loaded memory from {filename}", "Recorder")
         except FileNotFoundError:
             return False
@@ -437,9 +634,48 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         """
         if not filename.endswith(".json"):
             filename += ".json"
-        with open("./recordings/" + filename, "w") as f:
-            json.dump([entry.serialize() for entry in self.memory], f, indent=4)
-            self.add_feed(f"Dumped memory to {filename}", "Recorder")
+        self.write_memory(filename)
+        self.add_feed(f"Dumped memory to {filename}", "Recorder")
+
+    def write_memory(self, filename: str = "memory.json") -> int:
+        """
+        Write a snapshot of the memory to a file under ./recordings/
+
+        The file is written next to the target and then replaced, so it never holds a partial dump. (Thread-safe)
+
+        Args:
+            filename (str, optional): The name of the file to write the memory to. Defaults to "memory.json".
+
+        Returns:
+            int: The memory generation of the written snapshot.
+        """
+        with self._write_lock:
+            generation = self.memory_generation
+            data = orjson.dumps(
+                [entry.serialize() for entry in list(self.memory)],
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+            )
+            path = "./recordings/" + filename
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        return generation
+
+    def autosave_memory(self, stopped: threading.Event):
+        """
+        Background loop writing the memory to ./recordings/memory.json whenever it changed,
+        so stopping only has to write the changes of the last interval.
+
+        Args:
+            stopped (threading.Event): The event ending the loop.
+        """
+        while not stopped.wait(self.autosave_interval):
+            if self.memory_generation != self._autosaved_generation:
+                try:
+                    self._autosaved_generation = self.write_memory()
+                except Exception as e:
+                    # Keep autosaving, the next interval retries
+                    self.add_feed(f"Autosave failed: {e}", "Recorder")
 
     def start(self):
         """
@@ -447,44 +683,102 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         """
         self.running = True
         self.add_feed("Started recording", "Recorder")
-        super().start()
+        if self._autosave_thread is None or not self._autosave_thread.is_alive():
+            self._autosave_stopped = threading.Event()
+            self._autosave_thread = threading.Thread(
+                target=self.autosave_memory, args=(self._autosave_stopped,), daemon=True
+            )
+            self._autosave_thread.start()
+        # A shut down executor can not be reused, so every start gets a fresh one
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="RobotRecorder"
+        )
+        self._control_loop = self._executor.submit(self.run)
+        self._control_loop.add_done_callback(self.log_loop_exit)
+        self._display_loop = self._executor.submit(self.refresh_display)
+        self._display_loop.add_done_callback(self.log_loop_exit)
+
+    def join(self, timeout: float = None):
+        """
+        Wait for the control and display loops to finish.
+
+        Args:
+            timeout (float, optional): The maximum time to wait in seconds. Defaults to None (wait forever).
+        """
+        loops = [loop for loop in (self._control_loop, self._display_loop) if loop is not None]
+        if loops:
+            concurrent.futures.wait(loops, timeout)
+
+    def is_alive(self) -> bool:
+        """
+        Check if the control loop is running.
+
+        Returns:
+            bool: True if the control loop is running, False otherwise.
+        """
+        return self._control_loop is not None and not self._control_loop.done()
+
+    def log_loop_exit(self, loop: concurrent.futures.Future):
+        """
+        Log the exception the control or display loop died with, if any.
+
+        Args:
+            loop (concurrent.futures.Future): The finished loop.
+        """
+        if loop.exception() is not None:
+            self.add_feed(f"Loop failed: {loop.exception()}", "Recorder")
 
     def stop(self):
         """
-        Stop the recording and dump the memory to a file.
+        Stop the recording and dump the memory to a file, unless the autosave is up to date.
         """
         self.add_feed("Shutting down", "Recorder")
         self.running = False
         self.join()
 
-        self.dump_memory()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+        if self._autosave_thread is not None:
+            self._autosave_stopped.set()
+            self._autosave_thread.join()
+            self._autosave_thread = None
+        if self.memory_generation != self._autosaved_generation:
+            self.dump_memory()
 
         self.close_robot()
         # self.controller.close()
-        time.sleep(1)
 
-    def bound_movement(self, movement: list) -> list:
+    def bound_movement(self, movement: np.ndarray, out: np.ndarray = None) -> np.ndarray:
         """
         Bound the movement of the robot in an attempt to prevent invalid movements.
 
         Args:
-            movement (list): The movement to be bounded.
+            movement (np.ndarray): The movement to be bounded.
+            out (np.ndarray, optional): The array to write the bounded movement to. Defaults to None (a new array).
 
         Returns:
-            list: The bounded movement.
+            np.ndarray: The bounded movement.
 
         Raises:
             Exception: If no angles are available.
         """
 
-        current_angles = self.angles.copy()
+        current_angles = self._angles_buffer
 
-        if current_angles.size:
-            attempted_angles = current_angles + movement
-            attempted_angles = np.clip(
-                attempted_angles, self.joint_bounds[:, 0], self.joint_bounds[:, 1]
+        if self.fill_angles(current_angles):
+            if out is None:
+                out = np.empty_like(movement, dtype=float)
+            return bound(
+                current_angles,
+                movement,
+                self._lower_bounds,
+                self._upper_bounds,
+                out,
             )
-            return attempted_angles - current_angles
         else:
             raise Exception("No angles available")
 
@@ -492,25 +786,20 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         """
         Move the robot according to the controller buffer values.
         """
-        movement = [0] * self.number_of_joints
-        movement[self.active_joint] = (
-            self.controller_buffer["joint_pos"] - self.controller_buffer["joint_neg"]
-        ) * self.max_speed[self.active_joint]
-        movement[self.joystick_mapping["left"]] += (
-            self.controller_buffer["left_joystick"]
-            * self.max_speed[self.joystick_mapping["left"]]
+        movement = mix_movement(
+            self._joint_mix, self.controller_buffer, self.max_speed, self._movement_buffer
         )
-        movement[self.joystick_mapping["right"]] += (
-            self.controller_buffer["right_joystick"]
-            * self.max_speed[self.joystick_mapping["right"]]
-        )
-        movement = self.bound_movement(movement)
-        movement = np.where(np.abs(movement) < 0.5, 0, movement)
-        if np.any(movement):
+        try:
+            movement = self.bound_movement(movement, out=movement)
+        except Exception:
+            # The failed read is already in the feed, skip the tick instead of bounding against zeros
+            return
+        if apply_deadzone(movement, 0.5, self._magnitude_buffer, self._deadzone_mask):
             try:
                 self.move_joint_relative(movement)
-                if self.mode == MemoryType.RELATIVE and np.abs(np.sum(movement)) > 0:
-                    self.save(MemoryType.RELATIVE, MotionType.JOINT, movement)
+                if self.mode == MemoryType.RELATIVE:
+                    # The buffer is overwritten on the next tick
+                    self.save(MemoryType.RELATIVE, MotionType.JOINT, movement.copy())
             except ConnectionAbortedError:
                 self.add_feed("Connection aborted", "Recorder")
 
@@ -518,30 +807,139 @@ class RobotRecorder(threading.Thread, RobotInterface, ControllerInterface):
         """
         Optimize the relative movement in the memory by grouping consecutive relative movements in the same directions.
         """
-        optimized_memory = [self.memory[0]]
-        for entry in self.memory[1:]:
-            if (
-                entry.type == optimized_memory[-1].type == MemoryType.RELATIVE
-                and entry.motion_type == optimized_memory[-1].motion_type
-                and np.array_equal(
-                    np.sign(entry.value), np.sign(optimized_memory[-1].value)
-                )
-            ):
-                optimized_memory[-1].value = np.array(
-                    optimized_memory[-1].value
-                ) + np.array(entry.value)
-                if not entry.valid:
-                    optimized_memory[-1].valid = False
-            else:
-                optimized_memory.append(entry)
-        self.memory = optimized_memory
+        memory = self.memory
+        if not memory:
+            return
+        # Consecutive entries with equal keys are merged, None never merges
+        keys = [
+            (entry.motion_type, entry.sign_key)
+            if entry.type == MemoryType.RELATIVE
+            else None
+            for entry in memory
+        ]
+        starts = [0] + [
+            i
+            for i in range(1, len(memory))
+            if keys[i] is None or keys[i] != keys[i - 1]
+        ]
+
+        # Sum all groups at once, a group is a contiguous run of the relative entries
+        relative = [i for i, key in enumerate(keys) if key is not None]
+        if relative:
+            position = {index: j for j, index in enumerate(relative)}
+            group_starts = [i for i in starts if keys[i] is not None]
+            offsets = [position[i] for i in group_starts]
+            values = np.add.reduceat(
+                np.array([memory[i].value for i in relative]), offsets
+            )
+            valid = np.logical_and.reduceat(
+                np.array([memory[i].valid for i in relative]), offsets
+            )
+            for row, i in enumerate(group_starts):
+                memory[i].value = values[row]
+                memory[i].valid = bool(valid[row])
+
+        self.memory = [memory[i] for i in starts]
+        self.memory_generation += 1
+
+    @override
+    def replay(self, memory: list):
+        """
+        Replay the memory, replaying may invalidate memory entries.
+
+        Args:
+            memory (list): The memory entries to be replayed.
+        """
+        RobotInterface.replay(self, memory)
+        self.memory_generation += 1
 
     def run(self):
         """
-        Main loop for the robot recording. Moving the robot and updating the displayed pose and angles.
+        Control loop for the robot recording. Moving the robot at the control rate.
+
+        While there is no controller input the loop does not tick, it waits for input instead.
         """
-        while self.running:
-            for _ in range(10):
+        # The loop runs on a pooled worker, which must not keep the pinning and priority afterwards
+        previous_scheduling = self.set_control_scheduling()
+        try:
+            next_tick = time.perf_counter()
+            while self.running:
+                if not self._input_active.is_set():
+                    # Time out regularly to notice a stop
+                    if not self._input_active.wait(self.display_interval):
+                        continue
+                    next_tick = time.perf_counter()
                 self.move_robot()
-            self.displayed_pose[:] = self.pose
-            self.displayed_angles[:] = self.angles
+                next_tick = self.wait_for_tick(next_tick + self.control_period)
+        finally:
+            self.restore_scheduling(previous_scheduling)
+
+    def refresh_display(self):
+        """
+        Display loop for the robot recording. Updating the displayed pose and angles every display_interval,
+        independent of the control loop. (The robot may also move without controller input, e.g. during a replay)
+        """
+        while self.running:
+            self.fill_pose(self._state_buffer[0])
+            self.fill_angles(self._state_buffer[1])
+            if not np.array_equal(self._state_buffer, self.displayed_state):
+                self.displayed_state[:] = self._state_buffer
+                self.pose_generation += 1
+            time.sleep(self.display_interval)
+
+    def set_control_scheduling(self) -> tuple:
+        """
+        Pin the calling thread to control_cpu and give it the SCHED_FIFO priority control_priority, to reduce
+        the jitter of the control loop. Skipped where not supported, the priority requires CAP_SYS_NICE.
+
+        Returns:
+            tuple: The previous (affinity, policy, param) of the calling thread for restore_scheduling,
+                None if nothing was changed.
+        """
+        if self.control_cpu is None and self.control_priority is None:
+            return None
+        previous = None
+        try:
+            previous = (os.sched_getaffinity(0), os.sched_getscheduler(0), os.sched_getparam(0))
+            if self.control_cpu is not None:
+                os.sched_setaffinity(0, {self.control_cpu})
+            if self.control_priority is not None:
+                os.sched_setscheduler(
+                    0, os.SCHED_FIFO, os.sched_param(self.control_priority)
+                )
+        except (AttributeError, OSError) as e:
+            self.add_feed(f"Could not set control loop scheduling: {e}", "Recorder")
+        return previous
+
+    def restore_scheduling(self, previous: tuple):
+        """
+        Restore the affinity and scheduling policy of the calling thread saved by set_control_scheduling.
+
+        Args:
+            previous (tuple): The (affinity, policy, param) to restore, None to do nothing.
+        """
+        if previous is None:
+            return
+        affinity, policy, param = previous
+        try:
+            os.sched_setscheduler(0, policy, param)
+            os.sched_setaffinity(0, affinity)
+        except OSError as e:
+            self.add_feed(f"Could not restore scheduling: {e}", "Recorder")
+
+    def wait_for_tick(self, deadline: float) -> float:
+        """
+        Wait until the deadline of the next tick. If the deadline already passed (move_robot blocks until
+        the movement is done), the next tick starts right away instead of catching up on the missed ones.
+
+        Args:
+            deadline (float): The time.perf_counter() value the next tick is due at.
+
+        Returns:
+            float: The deadline of the tick that was waited for.
+        """
+        now = time.perf_counter()
+        if now >= deadline:
+            return now
+        time.sleep(deadline - now)
+        return deadline
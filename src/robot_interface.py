@@ -1,11 +1,76 @@
+import os
 import re
-import json
 import time
+import orjson
+import functools
+import socket
 import threading
 import numpy as np
 
 from utils import MemoryType, MotionType, EndEffectorPins, EndEffectorType, pin_mapping
-from include.dobot_api import DobotApiDashboard, DobotApiMove
+from include.dobot_api import DobotApi, DobotApiDashboard, DobotApiMove, MyType
+
+ERROR_CODE_PATTERN = re.compile(r"-?\d+")
+
+# RobotMode() reply of a robot in the error state
+ROBOT_MODE_ERROR = 9
+
+# Marks a valid real-time feedback frame
+FEEDBACK_TEST_VALUE = 0x0123456789ABCDEF
+FEEDBACK_TEST_BYTES = np.array(FEEDBACK_TEST_VALUE, dtype=MyType.fields["test_value"][0]).tobytes()
+FEEDBACK_TEST_OFFSET = MyType.fields["test_value"][1]
+# [x, y, z, r] out of tool_vector_actual [x, y, z, rx, ry, rz], the r of the 4 axis arm is rz
+FEEDBACK_POSE_INDICES = [0, 1, 2, 5]
+
+ERROR_CODES_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "error_codes.json")
+
+
+def parse_feedback_frame(frame, number_of_joints: int, out: np.ndarray) -> bool:
+    """
+    Writes the pose (row 0) and angles (row 1) of a real-time feedback frame into an existing array.
+
+    Args:
+        frame (bytes-like): One frame of MyType.itemsize bytes.
+        number_of_joints (int): The number of joints of the robot.
+        out (np.ndarray): The (2, number_of_joints) array the values are written to. Untouched for invalid frames.
+
+    Returns:
+        bool: True if the frame passed the test value check, False otherwise.
+    """
+    values = np.frombuffer(frame, dtype=MyType)[0]
+    if values["test_value"] != FEEDBACK_TEST_VALUE:
+        return False
+    out[0] = values["tool_vector_actual"][FEEDBACK_POSE_INDICES]
+    out[1] = values["q_actual"][:number_of_joints]
+    return True
+
+
+def find_feedback_frame_start(frame) -> int:
+    """
+    Finds where the next frame starts in a misaligned feedback buffer, by the position of its test value.
+
+    Args:
+        frame (bytearray): One frame worth of received bytes.
+
+    Returns:
+        int: The offset of the next frame start in the buffer, -1 if no test value was found.
+    """
+    position = frame.find(FEEDBACK_TEST_BYTES)
+    if position < 0:
+        return -1
+    return (position - FEEDBACK_TEST_OFFSET) % len(frame)
+
+
+@functools.lru_cache(maxsize=None)
+def load_error_translation() -> dict:
+    """
+    Loads the error code translations once, shared by all robot interfaces.
+
+    Returns:
+        dict: A dictionary mapping error codes to their descriptions.
+    """
+    with open(ERROR_CODES_PATH, "rb") as f:
+        return {int(k): v for k, v in orjson.loads(f.read()).items()}
 
 
 class RobotInterface:
@@ -21,6 +86,8 @@ class RobotInterface:
         end_effector (EndEffectorType): The end effector type of the robot.
         end_effector_pins (EndEffectorPins): The end effector pins of the robot.
         end_effector_state (int): The state of the end effector.
+        feedback_port (int): The port number of the real-time feedback connection, None if not used.
+        feedback_max_age (float): The maximum age in seconds of a feedback frame served instead of a dashboard query.
 
     Methods:
         __init__: Initializes the RobotInterface object.
@@ -28,6 +95,11 @@ class RobotInterface:
         init_robot: Initializes the robot.
         reconnect: Reconnects to the robot.
         close_robot: Closes the robot connection.
+        disable_nagle: Disables Nagle's algorithm on a dobot connection.
+        recv_into_full: Receives from a connection until a buffer is full.
+        wait_for_error_cleared: Waits until the robot has left the error mode.
+        read_feedback: Background loop reading the real-time feedback frames.
+        fill_from_feedback: Writes the latest fresh feedback values into an existing array.
         move_joint_absolute: Moves the robot to the specified joint coordinates.
         move_linear_absolute: Moves the robot to the specified linear coordinates.
         move_joint_relative: Moves the robot relative to the current joint coordinates.
@@ -47,6 +119,9 @@ class RobotInterface:
         extract_error_codes: Extracts the error codes from a string.
         extract_pose: Extracts the pose from a string.
         extract_angles: Extracts the angles from a string.
+        extract_into: Extracts the values from a string into an existing array.
+        fill_pose: Writes the current pose of the robot into an existing array.
+        fill_angles: Writes the current angles of the robot into an existing array.
         pose: Property that returns the current pose of the robot.
         angles: Property that returns the current angles of the robot.
         error_id: Property that returns the error codes of the robot.
@@ -63,6 +138,7 @@ class RobotInterface:
         end_effector: EndEffectorType = EndEffectorType.NO_END_EFFECTOR,
         end_effector_pins: EndEffectorPins = None,
         end_effector_state: int = 0,
+        feedback_port: int = None,
     ):
         """
         Initializes the RobotInterface object.
@@ -73,9 +149,28 @@ class RobotInterface:
             move_port (int): The port number for the move connection.
             number_of_joints (int): The number of joints in the robot.
             print_function (callable): The function used for printing log messages.
+            feedback_port (int): The port number of the real-time feedback connection (30004),
+                None to query pose and angles over the dashboard connection only.
+
+        Raises:
+            ValueError: If the feedback connection is used with a robot that does not have 4 joints.
         """
+        # The feedback pose is always [x, y, z, r], which only lines up with the angles of a 4 axis arm
+        if feedback_port is not None and number_of_joints != len(FEEDBACK_POSE_INDICES):
+            raise ValueError(
+                f"The feedback connection requires {len(FEEDBACK_POSE_INDICES)} joints, got {number_of_joints}"
+            )
         self._dashboard = None
         self._move = None
+        self._feedback = None
+        self._feedback_thread = None
+
+        # Latest pose (row 0) and angles (row 1) from the feedback connection
+        self._feedback_state = np.zeros((2, number_of_joints))
+        self._feedback_time = 0.0
+        self._feedback_lock = threading.Lock()
+        self.feedback_port = feedback_port
+        self.feedback_max_age = 0.1
 
         self.dashboard_lock = threading.Lock()
 
@@ -83,10 +178,7 @@ class RobotInterface:
         self.identifier = robot_ip.split(".")[-1]
         self.dashboard_port = dashboard_port
         self.move_port = move_port
-        self.error_translation = json.load(
-            open("../data/error_codes.json", "r"),
-        )
-        self.error_translation = {int(k): v for k, v in self.error_translation.items()}
+        self.error_translation = load_error_translation()
 
         self.number_of_joints = number_of_joints
 
@@ -117,20 +209,74 @@ class RobotInterface:
                 self.robot_ip, self.dashboard_port, False
             )
             self._move = DobotApiMove(self.robot_ip, self.move_port, False)
+            self.disable_nagle(self._dashboard)
+            self.disable_nagle(self._move)
+            if self.feedback_port is not None:
+                self._feedback = DobotApi(self.robot_ip, self.feedback_port)
+                # Time out regularly, so the reader notices a closed connection
+                self._feedback.socket_dobot.settimeout(0.1)
+                self._feedback_thread = threading.Thread(
+                    target=self.read_feedback, args=(self._feedback,), daemon=True
+                )
+                self._feedback_thread.start()
             self.log_robot("Connection successful")
         except Exception as e:
             self.log_robot("Connection failure")
             raise e
 
+    @staticmethod
+    def disable_nagle(api: DobotApi):
+        """
+        Disables Nagle's algorithm on the socket of a dobot connection. The connections carry small
+        request/reply commands, which would otherwise wait for the ACK of the previous packet.
+
+        Args:
+            api (DobotApi): The dobot connection.
+        """
+        api.socket_dobot.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
     def init_robot(self):
         """
         Initializes the robot by clearing any errors and enabling the robot. (Thread-safe)
         """
         with self.dashboard_lock:
             self._dashboard.ClearError()
-            time.sleep(0.5)
+            self.wait_for_error_cleared()
             self._dashboard.EnableRobot()
 
+    def wait_for_error_cleared(self, timeout: float = 0.5, poll_interval: float = 0.01) -> bool:
+        """
+        Waits until the robot has left the error mode after a ClearError, at most timeout seconds.
+        (Call while holding the dashboard lock)
+
+        Args:
+            timeout (float): The maximum time to wait in seconds.
+            poll_interval (float): The time between two RobotMode queries in seconds.
+
+        Returns:
+            bool: True if the robot left the error mode, False if it was still in it after the timeout.
+
+        Raises:
+            OSError: If the dashboard connection fails.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            result = self._dashboard.RobotMode()
+            try:
+                return_value, method_name = self.extract_metavalues(result)
+                if (
+                    return_value == 0
+                    and method_name == "RobotMode"
+                    and int(result[result.find("{") + 1 : result.find("}")]) != ROBOT_MODE_ERROR
+                ):
+                    return True
+            except (ValueError, IndexError):
+                # Malformed reply, ask again
+                pass
+            time.sleep(poll_interval)
+        self.log_robot(f"Robot still in error mode {timeout} s after clearing the error")
+        return False
+
     def robot_is_alive(self):
         """
         Check if the robot is alive by attempting to get its pose from the dashboard. (Thread-safe)
@@ -165,6 +311,84 @@ class RobotInterface:
             time.sleep(0.5)
             self._dashboard.close()
         self._move.close()
+        if self._feedback is not None:
+            self._feedback.close()
+            self._feedback_thread.join()
+            self._feedback = None
+
+    def read_feedback(self, feedback: DobotApi):
+        """
+        Background loop reading the real-time feedback frames, which the robot sends every 8 ms,
+        and keeping the latest pose and angles. Ends when the feedback connection is closed.
+
+        A frame failing the test value check means the stream is misaligned, the loop then realigns
+        to the next frame start found in the received bytes.
+
+        Args:
+            feedback (DobotApi): The feedback connection to read from.
+        """
+        frame = bytearray(MyType.itemsize)
+        view = memoryview(frame)
+        # Bytes of the next frame already at the start of the buffer after realigning
+        kept = 0
+        while self.recv_into_full(feedback.socket_dobot, view[kept:]):
+            kept = 0
+            with self._feedback_lock:
+                valid = parse_feedback_frame(frame, self.number_of_joints, self._feedback_state)
+                if valid:
+                    self._feedback_time = time.perf_counter()
+            if not valid:
+                start = find_feedback_frame_start(frame)
+                if start < 0:
+                    # The test value may straddle the end of the buffer, keep the bytes that could hold its start
+                    start = len(frame) - (len(FEEDBACK_TEST_BYTES) - 1)
+                kept = len(frame) - start
+                frame[:kept] = frame[start:]
+
+    @staticmethod
+    def recv_into_full(connection: socket.socket, view: memoryview) -> bool:
+        """
+        Receives from a connection until the view is full, retrying on timeouts.
+
+        Args:
+            connection (socket.socket): The connection to receive from.
+            view (memoryview): The buffer to fill.
+
+        Returns:
+            bool: True if the view was filled, False if the connection was closed.
+        """
+        received = 0
+        while received < len(view):
+            try:
+                n = connection.recv_into(view[received:])
+            except socket.timeout:
+                continue
+            except OSError:
+                return False
+            if n == 0:
+                return False
+            received += n
+        return True
+
+    def fill_from_feedback(self, row: int, out) -> bool:
+        """
+        Writes the latest feedback pose (row 0) or angles (row 1) into an existing array,
+        if the feedback connection is used and its latest frame is at most feedback_max_age old.
+
+        Args:
+            row (int): 0 for the pose, 1 for the angles.
+            out (numpy.ndarray): The array the values are written to.
+
+        Returns:
+            bool: True if the values were written, False otherwise.
+        """
+        if self._feedback is None:
+            return False
+        with self._feedback_lock:
+            if time.perf_counter() - self._feedback_time > self.feedback_max_age:
+                return False
+            out[:] = self._feedback_state[row]
+        return True
 
     def log_robot(self, msg: str):
         """
@@ -185,7 +409,7 @@ class RobotInterface:
         self.log_robot("Clearing error (" + str(self.error_id) + ")")
         with self.dashboard_lock:
             self._dashboard.ClearError()
-            time.sleep(0.5)
+            self.wait_for_error_cleared()
             self._dashboard.EnableRobot()
 
     def set_end_effector(self, end_effector: EndEffectorType):
@@ -315,8 +539,9 @@ class RobotInterface:
             bool: True if the function executed successfully without any errors, False otherwise.
         """
         func(params)
-        if len(self.error_id):
-            self.log_robot(f"Invalid movement [{self.error_id}]")
+        errors = self.error_id
+        if errors:
+            self.log_robot(f"Invalid movement [{errors}]")
             self.clear_error()
             return False
         return True
@@ -376,8 +601,9 @@ class RobotInterface:
         Returns:
             tuple: A tuple containing the return value and method name extracted from the input string.
         """
-        return_value = int(s.split(",")[0])
-        method_name = re.search(r"\b\w+\b(?=\(\);)", s).group()
+        # Replies look like "0,{...},GetPose();", plain string slicing is faster than a regex here
+        return_value = int(s[: s.find(",")])
+        method_name = s[s.rfind(",") + 1 : s.rfind("(")].strip()
 
         return return_value, method_name
 
@@ -393,10 +619,8 @@ class RobotInterface:
             list: A list of error codes extracted from the input string.
         """
         error_codes_str = s[s.find("[") : s.rfind("]") + 1]
-        error_codes = json.loads(error_codes_str)
-
-        error_codes = [item for sublist in error_codes for item in sublist]
-        return error_codes
+        # Flat scan over the nested lists, [] in the common case without errors: [[],[],[],[],[],[]]
+        return [int(code) for code in ERROR_CODE_PATTERN.findall(error_codes_str)]
 
     def extract_pose(self, s):
         """
@@ -406,28 +630,51 @@ class RobotInterface:
             s (str): The string representation of the pose.
 
         Returns:
-            tuple: A tuple containing the extracted pose values.
+            numpy.ndarray: The extracted pose values.
         """
-        return np.fromstring(s[s.find("{") + 1 : s.find("}")], sep=",")[
-            : self.number_of_joints
-        ]
+        pose = np.empty(self.number_of_joints)
+        self.extract_into(s, pose)
+        return pose
 
     def extract_angles(self, s):
-        return np.fromstring(s[s.find("{") + 1 : s.find("}")], sep=",")[
-            : self.number_of_joints
-        ]
-
-    @property
-    def pose(self):
         """
-        Returns the pose of the robot in [x, y, z, r] format. (Thread-safe)
+        Extracts the angles from the dobot call.
+
+        Args:
+            s (str): The string representation of the angles.
 
         Returns:
-            numpy.ndarray: The pose of the robot as a numpy array.
+            numpy.ndarray: The extracted angle values.
+        """
+        angles = np.empty(self.number_of_joints)
+        self.extract_into(s, angles)
+        return angles
 
-        Raises:
-            Exception: If there is an error getting the pose.
+    def extract_into(self, s, out):
+        """
+        Extracts the values between the braces of a dobot call into an existing array.
+
+        Args:
+            s (str): The string representation of the values.
+            out (numpy.ndarray): The array the first number_of_joints values are written to.
+        """
+        values = s[s.find("{") + 1 : s.find("}")].split(",", self.number_of_joints)
+        for i in range(self.number_of_joints):
+            out[i] = float(values[i])
+
+    def fill_pose(self, out):
         """
+        Writes the pose of the robot in [x, y, z, r] format into an existing array. (Thread-safe)
+        Served from the feedback connection while it is fresh, queried over the dashboard connection otherwise.
+
+        Args:
+            out (numpy.ndarray): The array the pose is written to. Set to zero on error.
+
+        Returns:
+            bool: True if the pose was read, False otherwise.
+        """
+        if self.fill_from_feedback(0, out):
+            return True
         try:
             with self.dashboard_lock:
                 result = self._dashboard.GetPose()
@@ -435,40 +682,66 @@ class RobotInterface:
             return_value, method_name = self.extract_metavalues(result)
 
             if return_value == 0 and method_name == "GetPose":
-                pose = self.extract_pose(result)
-                return pose
+                self.extract_into(result, out)
+                return True
             else:
                 self.log_robot(f"Error extracting pose {result}")
-                return np.array([0, 0, 0, 0])
         except Exception as e:
             self.log_robot(f"Error getting pose {e}")
-            return np.array([0, 0, 0, 0])
+        out[:] = 0
+        return False
 
-    @property
-    def angles(self):
+    def fill_angles(self, out):
         """
-        Returns the angles of the robot in [j1, j2, j3, j4] format. (Thread-safe)
+        Writes the angles of the robot in [j1, j2, j3, j4] format into an existing array. (Thread-safe)
+        Served from the feedback connection while it is fresh, queried over the dashboard connection otherwise.
 
-        Returns:
-            numpy.ndarray: An array containing the angles of the robot in [j1, j2, j3, j4] format.
+        Args:
+            out (numpy.ndarray): The array the angles are written to. Set to zero on error.
 
-        Raises:
-            Exception: If there is an error getting the angles.
+        Returns:
+            bool: True if the angles were read, False otherwise.
         """
+        if self.fill_from_feedback(1, out):
+            return True
         try:
             with self.dashboard_lock:
                 result = self._dashboard.GetAngle()
 
             return_value, method_name = self.extract_metavalues(result)
             if return_value == 0 and method_name == "GetAngle":
-                angles = self.extract_angles(result)
-                return angles
+                self.extract_into(result, out)
+                return True
             else:
                 self.log_robot(f"Error extracting angles {result}")
-                return np.array([0, 0, 0, 0])
         except Exception as e:
             self.log_robot(f"Error getting angles {e}")
-            return np.array([0, 0, 0, 0])
+        out[:] = 0
+        return False
+
+    @property
+    def pose(self):
+        """
+        Returns the pose of the robot in [x, y, z, r] format. (Thread-safe)
+
+        Returns:
+            numpy.ndarray: The pose of the robot as a numpy array. Zeros on error.
+        """
+        pose = np.zeros(self.number_of_joints)
+        self.fill_pose(pose)
+        return pose
+
+    @property
+    def angles(self):
+        """
+        Returns the angles of the robot in [j1, j2, j3, j4] format. (Thread-safe)
+
+        Returns:
+            numpy.ndarray: An array containing the angles of the robot in [j1, j2, j3, j4] format. Zeros on error.
+        """
+        angles = np.zeros(self.number_of_joints)
+        self.fill_angles(angles)
+        return angles
 
     @property
     def error_id(self):
@@ -487,55 +760,47 @@ class RobotInterface:
             return_value, method_name = self.extract_metavalues(result)
 
             if return_value == 0 and method_name == "GetErrorID":
-                translations = []
-                for error_code in self.extract_error_codes(result):
-                    if error_code in self.error_translation:
-                        translations.append(self.error_translation[error_code])
-                    else:
-                        translations.append(f"Unknown error {error_code}")
-                return translations
+                return [
+                    self.error_translation.get(error_code, f"Unknown error {error_code}")
+                    for error_code in self.extract_error_codes(result)
+                ]
             else:
                 self.log_robot(f"Error extracting error codes {result}")
-        except json.decoder.JSONDecodeError:
-            self.log_robot(f"Error in JSON parsing")
-            return []
         except Exception as e:
             self.log_robot(f"Error getting error id {e}")
-            print("Result", result)
+        return []
 
     def replay(self, memory):
         """
         Replays a sequence of robot movements stored in the memory.
 
         Args:
-            memory (list): A list of memory entries representing the robot movements.
+            memory (iterable): An iterable of memory entries representing the robot movements.
         """
         self.log_robot("Replaying")
-        for i, entry in enumerate(memory):
-            if entry.type == MemoryType.ABSOLUTE:
-                if entry.motion_type == MotionType.LINEAR:
-                    func = self.move_linear_absolute
-                elif entry.motion_type == MotionType.JOINT:
-                    func = self.move_joint_absolute
-            elif entry.type == MemoryType.RELATIVE:
-                if entry.motion_type == MotionType.LINEAR:
-                    func = self.move_linear_relative
-                elif entry.motion_type == MotionType.JOINT:
-                    func = self.move_joint_relative
-            elif entry.type == MemoryType.END_EFFECTOR:
+        move_functions = {
+            (MemoryType.ABSOLUTE, MotionType.LINEAR): self.move_linear_absolute,
+            (MemoryType.ABSOLUTE, MotionType.JOINT): self.move_joint_absolute,
+            (MemoryType.RELATIVE, MotionType.LINEAR): self.move_linear_relative,
+            (MemoryType.RELATIVE, MotionType.JOINT): self.move_joint_relative,
+        }
+        memory = iter(memory)
+        for entry in memory:
+            if entry.type == MemoryType.END_EFFECTOR:
                 for index, value in entry.value:
                     self.set_digital_output(index, value)
                     time.sleep(0.1)
                 continue
+            func = move_functions[(entry.type, entry.motion_type)]
 
             result = self.nonblocking_move(func, entry.value)
             if not result:
                 self.log_robot(
-                    f"Error replaying from {self.pose if entry.motion_type == MemoryType.ABSOLUTE else self.angles} "
+                    f"Error replaying from {self.pose if entry.type == MemoryType.ABSOLUTE else self.angles} "
                 )
                 self.log_robot(f"Error replaying to {entry.value}")
-                for j in range(i, len(memory)):
-                    memory[j].valid = False
+                entry.valid = False
+                for remaining_entry in memory:
+                    remaining_entry.valid = False
                 break
-            self._move.Sync()
         self.log_robot("Done Replaying")
@@ -1,8 +1,7 @@
 import numpy as np
-from abc import ABC
 from enum import Enum
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 class MemoryType(Enum):
@@ -22,38 +21,57 @@ class MotionType(Enum):
     SUCTION_CUP = 3
 
 
-@dataclass
+# Name to member maps, looked up directly instead of through EnumMeta.__getitem__
+MEMORY_TYPES = MemoryType.__members__
+MOTION_TYPES = MotionType.__members__
+
+
+@dataclass(slots=True)
 class MemoryEntry:
     """Represents an entry in the memory.
 
     Attributes:
         type (MemoryType): The type of memory entry.
         value (np.ndarray): The value associated with the memory entry.
-            [x, y, z, r] for ABSOLUTE, [j1, j2, j3, j4] for RELATIVE, [index, value] for END_EFFECTOR.
+            [x, y, z, r] for ABSOLUTE, [j1, j2, j3, j4] for RELATIVE, [[pin index, state], ...] for END_EFFECTOR.
+            Converted to a contiguous float64 array for ABSOLUTE and RELATIVE entries.
         motion_type (MotionType): The motion type of the memory entry.
         valid (bool): Indicates whether the memory entry is valid or not.
+        sign_key (int): The signs of a RELATIVE value packed into one integer, 2 bits per joint. None for other types.
+            Summing values with the same sign_key keeps the sign_key.
     """
 
     type: MemoryType
     motion_type: MotionType
     value: np.ndarray
     valid: bool = True
+    sign_key: int = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.type != MemoryType.END_EFFECTOR:
+            self.value = np.ascontiguousarray(self.value, dtype=np.float64)
+        if self.type == MemoryType.RELATIVE:
+            self.sign_key = sum(
+                (1 if v > 0 else 2 if v < 0 else 0) << (2 * i)
+                for i, v in enumerate(self.value)
+            )
 
     def serialize(self) -> dict:
         """Serializes the MemoryEntry object into a dictionary.
 
         Returns:
             dict: A dictionary representation of the MemoryEntry object.
+                ABSOLUTE and RELATIVE values are passed through as is, dump them with orjson.OPT_SERIALIZE_NUMPY.
+                END_EFFECTOR values are converted to a list of [pin index, state] ints.
         """
         return {
             "Type": self.type.name,
             "Motion Type": self.motion_type.name,
-            "Value": [
-                float(el)
-                if self.type != MemoryType.END_EFFECTOR
-                else [float(iel) for iel in el]
-                for el in list(self.value)
-            ],
+            "Value": (
+                np.asarray(self.value).tolist()
+                if self.type == MemoryType.END_EFFECTOR
+                else self.value
+            ),
             "Valid": self.valid,
         }
 
@@ -68,14 +86,14 @@ class MemoryEntry:
             MemoryEntry: A MemoryEntry object created from the dictionary.
         """
         return MemoryEntry(
-            MemoryType[entry["Type"]],
-            MotionType[entry["Motion Type"]],
-            np.array(entry["Value"]),
+            MEMORY_TYPES[entry["Type"]],
+            MOTION_TYPES[entry["Motion Type"]],
+            np.asarray(entry["Value"]),
             entry["Valid"],
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class FeedEntry:
     """Represents an entry in the feed.
 
@@ -95,8 +113,10 @@ class FeedEntry:
         Returns:
             dict: A dictionary representation of the FeedEntry object.
         """
+        t = self.timestamp
         return {
-            "Timestamp": self.timestamp.strftime("%H:%M:%ST%d.%m.%Y"),
+            # Same as strftime("%H:%M:%ST%d.%m.%Y") without parsing the format string
+            "Timestamp": f"{t.hour:02d}:{t.minute:02d}:{t.second:02d}T{t.day:02d}.{t.month:02d}.{t.year:04d}",
             "Message": self.message,
             "Source": self.source,
         }
@@ -111,11 +131,20 @@ class FeedEntry:
         Returns:
             FeedEntry: A FeedEntry object created from the dictionary.
         """
-        return FeedEntry(
-            datetime.strptime(entry["Timestamp"], "%H:%M:%ST%d.%m.%Y"),
-            entry["Message"],
-            entry["Source"],
-        )
+        timestamp = entry["Timestamp"]
+        try:
+            # Fixed width "HH:MM:SSTDD.MM.YYYY", sliced directly instead of parsing the format string
+            timestamp = datetime(
+                int(timestamp[15:19]),
+                int(timestamp[12:14]),
+                int(timestamp[9:11]),
+                int(timestamp[0:2]),
+                int(timestamp[3:5]),
+                int(timestamp[6:8]),
+            )
+        except ValueError:
+            timestamp = datetime.strptime(timestamp, "%H:%M:%ST%d.%m.%Y")
+        return FeedEntry(timestamp, entry["Message"], entry["Source"])
 
 
 @dataclass
@@ -147,7 +176,7 @@ class EndEffectorType(Enum):
 
 
 @dataclass
-class EndEffectorPins(ABC):
+class EndEffectorPins:
     """Base class representing the pins of the end effector."""
 
     pass
@@ -0,0 +1,92 @@
+import os
+import sys
+import socket
+import threading
+import unittest
+import numpy as np
+
+# Same layout as the start script: the repository root and src on the path
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+
+from include.dobot_api import MyType
+from robot_interface import (
+    FEEDBACK_TEST_VALUE,
+    FEEDBACK_TEST_OFFSET,
+    RobotInterface,
+    parse_feedback_frame,
+    find_feedback_frame_start,
+)
+
+
+def feedback_frame(tool_vector, q) -> bytes:
+    """
+    Builds a synthetic real-time feedback frame.
+    """
+    values = np.zeros(1, dtype=MyType)
+    values["test_value"] = FEEDBACK_TEST_VALUE
+    values["tool_vector_actual"] = tool_vector
+    values["q_actual"] = q
+    return values.tobytes()
+
+
+class FeedbackTest(unittest.TestCase):
+    tool_vector = [100.0, 200.0, 300.0, 1.0, 2.0, 45.0]
+    q = [10.0, 20.0, 30.0, 40.0, 0.0, 0.0]
+
+    def test_parse_selects_rz_as_r(self):
+        out = np.zeros((2, 4))
+        self.assertTrue(parse_feedback_frame(feedback_frame(self.tool_vector, self.q), 4, out))
+        np.testing.assert_array_equal(out[0], [100.0, 200.0, 300.0, 45.0])
+        np.testing.assert_array_equal(out[1], [10.0, 20.0, 30.0, 40.0])
+
+    def test_parse_rejects_invalid_frame(self):
+        out = np.zeros((2, 4))
+        self.assertFalse(parse_feedback_frame(bytes(MyType.itemsize), 4, out))
+        np.testing.assert_array_equal(out, 0)
+
+    def test_find_frame_start(self):
+        frame = feedback_frame(self.tool_vector, self.q)
+        self.assertEqual(find_feedback_frame_start(bytearray(frame[100:] + frame[:100])), len(frame) - 100)
+        self.assertEqual(find_feedback_frame_start(bytearray(len(frame))), -1)
+
+    def read_stream(self, prefix: bytes, frames: int) -> RobotInterface:
+        """
+        Runs read_feedback over a stream of prefix followed by frames valid frames.
+        """
+        robot = object.__new__(RobotInterface)
+        robot.number_of_joints = 4
+        robot._feedback_lock = threading.Lock()
+        robot._feedback_state = np.zeros((2, 4))
+        robot._feedback_time = 0.0
+
+        reader, writer = socket.socketpair()
+        feedback = type("Feedback", (), {"socket_dobot": reader})()
+        writer.sendall(prefix + feedback_frame(self.tool_vector, self.q) * frames)
+        writer.close()
+        robot.read_feedback(feedback)
+        reader.close()
+        return robot
+
+    def assert_feedback_read(self, robot: RobotInterface):
+        self.assertGreater(robot._feedback_time, 0.0)
+        np.testing.assert_array_equal(robot._feedback_state[0], [100.0, 200.0, 300.0, 45.0])
+        np.testing.assert_array_equal(robot._feedback_state[1], [10.0, 20.0, 30.0, 40.0])
+
+    def test_read_feedback_realigns(self):
+        # A partial frame first, as if connected in the middle of a frame
+        frame = feedback_frame(self.tool_vector, self.q)
+        self.assert_feedback_read(self.read_stream(frame[-100:], 3))
+
+    def test_read_feedback_realigns_on_straddling_test_value(self):
+        # Every test value straddles the end of a receive buffer until the reader shifts its phase
+        prefix = bytes(MyType.itemsize - FEEDBACK_TEST_OFFSET - 4)
+        self.assert_feedback_read(self.read_stream(prefix, 3))
+
+    def test_feedback_requires_four_joints(self):
+        with self.assertRaises(ValueError):
+            RobotInterface(number_of_joints=6, feedback_port=30004)
+
+
+if __name__ == "__main__":
+    unittest.main()